@@ -1,7 +1,7 @@
+import bisect
+from typing import NamedTuple
+
 import streamlit as st
-import pandas as pd
-from scipy import stats
-import math
 
 st.set_page_config(page_title="Incrementality Test Budget Calculator", page_icon="📊", layout="wide")
 
@@ -20,14 +20,6 @@ It does NOT account for:
 For comprehensive incrementality measurement, consider Media Mix Modeling or multi-touch attribution solutions.
 """)
 
-# Sidebar inputs
-st.sidebar.header("Test Configuration")
-
-channel = st.sidebar.selectbox(
-    "Channel to Test",
-    ["YouTube", "Facebook", "Google Search", "LinkedIn", "Other"]
-)
-
 # Default costs per channel
 default_cpas = {
     "YouTube": 500,
@@ -37,41 +29,132 @@ default_cpas = {
     "Other": 200
 }
 
-monthly_spend = st.sidebar.number_input(
-    f"Current {channel} Monthly Spend",
-    value=30000,
-    step=5000
-)
+# Sidebar inputs
+st.sidebar.header("Test Configuration")
 
-total_signups = st.sidebar.number_input(
-    "Total Forms per Month (All Channels)",
-    value=4000,
-    step=100,
-    help="Total form submissions across all marketing channels"
+# Channel and the cap toggle stay outside the form: other inputs take their
+# labels, defaults and visibility from them, so they must apply immediately
+channel = st.sidebar.selectbox(
+    "Channel to Test",
+    ["YouTube", "Facebook", "Google Search", "LinkedIn", "Other"]
 )
 
-cpa = st.sidebar.number_input(
-    f"Cost Per Form - {channel}",
-    value=default_cpas.get(channel, 200),
-    step=50
+enable_budget_cap = st.sidebar.checkbox(
+    "Enable Budget Cap",
+    value=True,
+    help="Limit the maximum spend multiplier for business practicality"
 )
 
-duration = st.sidebar.slider(
-    "Test Duration (weeks)",
-    min_value=2,
-    max_value=16,
-    value=8,
-    step=2
-)
+# The remaining inputs are batched in a form so the calculator only reruns on
+# submit, not on every slider drag. Widgets whose label depends on the channel
+# get an explicit key so a submitted value survives the label change.
+with st.sidebar.form("config"):
+    monthly_spend = st.number_input(
+        f"Current {channel} Monthly Spend",
+        value=30000,
+        step=5000,
+        key="monthly_spend"
+    )
 
-aql_rate = st.sidebar.slider(
-    "Form → AQL Rate (%)",
-    value=65,
-    step=5,
-    help="Percentage of form submissions that become Auto-Qualified Leads"
-) / 100
+    total_signups = st.number_input(
+        "Total Forms per Month (All Channels)",
+        value=4000,
+        step=100,
+        help="Total form submissions across all marketing channels"
+    )
 
-# Cross-channel context (for awareness, not calculation)
+    cpa = st.number_input(
+        f"Cost Per Form - {channel}",
+        value=default_cpas.get(channel, 200),
+        step=50,
+        key=f"cpa_{channel}"  # Per-channel key so each channel starts from its own default
+    )
+
+    duration = st.slider(
+        "Test Duration (weeks)",
+        min_value=2,
+        max_value=16,
+        value=8,
+        step=2
+    )
+
+    aql_rate = st.slider(
+        "Form → AQL Rate (%)",
+        value=65,
+        step=5,
+        help="Percentage of form submissions that become Auto-Qualified Leads"
+    ) / 100
+
+    st.header("Statistical Parameters")
+
+    mde_input = st.slider(
+        "Minimum Detectable Lift (%)",
+        min_value=1,
+        max_value=30,
+        value=15,
+        step=1,
+        help="""
+        **What it means:** The smallest improvement you want to reliably detect.
+
+        **Examples:**
+        - 10% = Can detect if YouTube increases conversions by 10% or more
+        - 20% = Only detects large improvements of 20% or more
+
+        **Impact:** Lower values need more budget but detect smaller changes.
+        """
+    )
+
+    power_input = st.slider(
+        "Statistical Power (%)",
+        min_value=50,
+        max_value=100,
+        value=80,
+        step=5,
+        help="""
+        **What it means:** Your chance of detecting a real improvement if it exists.
+
+        **Examples:**
+        - 80% = If YouTube really works, you'll detect it 8 out of 10 times
+        - 90% = Higher confidence, but needs more budget
+
+        **Industry standard:** 80% is typical for marketing tests.
+        """
+    )
+
+    pvalue_input = st.selectbox(
+        "P-Value Threshold",
+        options=[0.01, 0.05, 0.10],
+        index=1,
+        format_func=lambda x: f"p < {x}",
+        help="""
+        **What it means:** How strict you are about calling results "statistically significant."
+
+        **Examples:**
+        - p < 0.05: 95% confident results are real (5% chance of false positive)
+        - p < 0.01: 99% confident results are real (1% chance of false positive)
+        - p < 0.10: 90% confident results are real (10% chance of false positive)
+
+        **Recommendation:** p < 0.05 is the marketing industry standard.
+        """
+    )
+
+    st.header("🏦 Budget Constraints")
+
+    if enable_budget_cap:
+        max_multiplier = st.slider(
+            "Maximum Spend Multiplier",
+            value=5.0,
+            step=0.5,
+            help="Cap the spend multiplier at this level regardless of statistical requirements"
+        )
+    else:
+        max_multiplier = None
+        st.info("⚠️ No budget cap - statistical requirements may generate very high multipliers")
+
+    st.form_submit_button("Update")
+
+# Cross-channel context (for awareness, not calculation) - kept outside the
+# form so the share metric and warnings reflect what was just entered
 st.sidebar.header("📊 Cross-Channel Context")
 st.sidebar.markdown("*For context only - not used in calculations*")
 
@@ -90,106 +173,38 @@ if channel_share < 10:
 elif channel_share > 50:
     st.sidebar.info("ℹ️ High channel share - results may be more reliable")
 
-st.sidebar.header("Statistical Parameters")
-
-mde_input = st.sidebar.slider(
-    "Minimum Detectable Lift (%)",
-    min_value=1,
-    max_value=30,
-    value=15,
-    step=1,
-    help="""
-    **What it means:** The smallest improvement you want to reliably detect.
-    
-    **Examples:**
-    - 10% = Can detect if YouTube increases conversions by 10% or more
-    - 20% = Only detects large improvements of 20% or more
-    
-    **Impact:** Lower values need more budget but detect smaller changes.
-    """
-)
-
-power_input = st.sidebar.slider(
-    "Statistical Power (%)",
-    min_value=50,
-    max_value=100,
-    value=80,
-    step=5,
-    help="""
-    **What it means:** Your chance of detecting a real improvement if it exists.
-    
-    **Examples:**
-    - 80% = If YouTube really works, you'll detect it 8 out of 10 times
-    - 90% = Higher confidence, but needs more budget
-    
-    **Industry standard:** 80% is typical for marketing tests.
-    """
-)
-
-pvalue_input = st.sidebar.selectbox(
-    "P-Value Threshold",
-    options=[0.01, 0.05, 0.10],
-    index=1,
-    format_func=lambda x: f"p < {x}",
-    help="""
-    **What it means:** How strict you are about calling results "statistically significant."
-    
-    **Examples:**
-    - p < 0.05: 95% confident results are real (5% chance of false positive)
-    - p < 0.01: 99% confident results are real (1% chance of false positive)
-    - p < 0.10: 90% confident results are real (10% chance of false positive)
-    
-    **Recommendation:** p < 0.05 is the marketing industry standard.
-    """
-)
-
-st.sidebar.header("🏦 Budget Constraints")
-
-enable_budget_cap = st.sidebar.checkbox(
-    "Enable Budget Cap",
-    value=True,
-    help="Limit the maximum spend multiplier for business practicality"
-)
-
-if enable_budget_cap:
-    max_multiplier = st.sidebar.slider(
-        "Maximum Spend Multiplier",
-        value=5.0,
-        step=0.5,
-        help="Cap the spend multiplier at this level regardless of statistical requirements"
-    )
-else:
-    max_multiplier = None
-    st.sidebar.info("⚠️ No budget cap - statistical requirements may generate very high multipliers")
-
 # Calculation
-def calculate_budget(spend, cpa, mde, power, weeks, significance=0.05, max_multiplier=None):
+_INV_433 = 1.0 / 4.33  # Months -> weeks (4.33 weeks per month)
+
+# MDE thresholds (upper bounds, inclusive) and the baseline conversions / category for each band
+# Lower MDE requires more conversions to detect smaller effects
+_MDE_THRESH = (5, 10, 15, 20)
+_MDE_CONV = (800, 400, 200, 150, 100)
+_MDE_CATEGORY = ('Very Small', 'Small', 'Moderate', 'Large', 'Very Large')
+
+class _Requirement(NamedTuple):
+    """Statistical requirement for a test, before any budget cap is applied."""
+    normal_budget: float
+    baseline_conversions: float
+    total_conversions_needed: float
+    required_budget: float
+    statistical_multiplier: float
+    mde_category: str
+
+def _calc_requirement(spend, cpa, mde, power, weeks, significance):
     """
-    Practical incrementality testing budget calculator.
-    
-    Now properly factors in Cost Per Acquisition (CPA) to determine required budget.
-    Higher CPA = need more budget to generate same statistical signal.
-    Optional max_multiplier caps the spend multiplier for business practicality.
+    Statistical requirement shared by the uncapped and capped calculations.
     """
     
-    weekly_spend = spend / 4.33
+    weekly_spend = spend * _INV_433
     normal_budget = weekly_spend * weeks
     
     # Calculate baseline conversions from normal spend
     baseline_conversions = normal_budget / cpa if cpa > 0 else 0
     
     # Minimum conversions needed for statistical detection based on MDE
-    # Lower MDE requires more conversions to detect smaller effects
-    if mde <= 5:
-        min_conversions_needed = 800  # Very small effects need large sample
-    elif mde <= 10:
-        min_conversions_needed = 400  # Small effects need strong signal  
-    elif mde <= 15:
-        min_conversions_needed = 200  # Moderate effects
-    elif mde <= 20:
-        min_conversions_needed = 150  # Larger effects
-    else:
-        min_conversions_needed = 100  # Large effects are easier to detect
+    mde_band = bisect.bisect_left(_MDE_THRESH, mde)
+    min_conversions_needed = _MDE_CONV[mde_band]
     
     # Adjust for statistical power and significance
     power_adjustment = 0.5 + (power * 0.5)  # Scale from 50% to 100%
@@ -203,47 +218,154 @@ def calculate_budget(spend, cpa, mde, power, weeks, significance=0.05, max_multi
     required_budget = total_conversions_needed * cpa
     calculated_multiplier = required_budget / normal_budget if normal_budget > 0 else 2.0
     
-    # Apply budget cap if enabled
-    if max_multiplier is not None and calculated_multiplier > max_multiplier:
-        # If statistical requirement exceeds cap, limit but note the constraint
-        multiplier = max_multiplier
-        total_budget = normal_budget * multiplier
-        is_capped = True
-    else:
-        # Use full statistical requirement
-        total_budget = required_budget
-        multiplier = calculated_multiplier
-        is_capped = False
+    return _Requirement(
+        normal_budget=normal_budget,
+        baseline_conversions=baseline_conversions,
+        total_conversions_needed=total_conversions_needed,
+        required_budget=required_budget,
+        statistical_multiplier=calculated_multiplier,
+        mde_category=_MDE_CATEGORY[mde_band],
+    )
+
+def _budget_result(req, cpa, total_budget, multiplier, is_capped):
+    """
+    Result dict for a chosen total budget; the tail shared by both variants.
+    """
     
-    incremental_budget = total_budget - normal_budget
+    incremental_budget = total_budget - req.normal_budget
     total_conversions_observed = total_budget / cpa if cpa > 0 else 0
     
     return {
         'incremental': incremental_budget,
         'total': total_budget,
-        'normal': normal_budget,
+        'normal': req.normal_budget,
         'multiplier': multiplier,
         'conversions': total_conversions_observed,
-        'baseline_conversions': baseline_conversions,
-        'total_conversions_needed': total_conversions_needed,
+        'baseline_conversions': req.baseline_conversions,
+        'total_conversions_needed': req.total_conversions_needed,
         'is_capped': is_capped,
-        'statistical_multiplier': calculated_multiplier,
-        'mde_category': 'Very Small' if mde <= 5 else 'Small' if mde <= 10 else 'Moderate' if mde <= 15 else 'Large' if mde <= 20 else 'Very Large'
+        'statistical_multiplier': req.statistical_multiplier,
+        'mde_category': req.mde_category
     }
 
+def _calc_uncapped(spend, cpa, mde, power, weeks, significance):
+    """
+    Budget without a cap: the full statistical requirement is always used.
+    """
+    
+    req = _calc_requirement(spend, cpa, mde, power, weeks, significance)
+    return _budget_result(req, cpa, req.required_budget, req.statistical_multiplier, False)
+
+def _calc_capped(spend, cpa, mde, power, weeks, significance, max_multiplier):
+    """
+    Budget with the spend multiplier limited to max_multiplier.
+    """
+    
+    req = _calc_requirement(spend, cpa, mde, power, weeks, significance)
+    
+    if req.statistical_multiplier > max_multiplier:
+        # If statistical requirement exceeds cap, limit but note the constraint
+        return _budget_result(req, cpa, req.normal_budget * max_multiplier, max_multiplier, True)
+    
+    # Use full statistical requirement
+    return _budget_result(req, cpa, req.required_budget, req.statistical_multiplier, False)
+
+def calculate_budget(spend, cpa, mde, power, weeks, significance=0.05, max_multiplier=None):
+    """
+    Practical incrementality testing budget calculator.
+    
+    Now properly factors in Cost Per Acquisition (CPA) to determine required budget.
+    Higher CPA = need more budget to generate same statistical signal.
+    Optional max_multiplier caps the spend multiplier for business practicality.
+    
+    Returns a dict with the incremental/total/normal budgets, the applied
+    multiplier, observed/baseline/needed conversions, whether the cap was hit
+    (is_capped), the uncapped statistical_multiplier and the mde_category.
+    """
+    
+    if max_multiplier is None:
+        return _calc_uncapped(spend, cpa, mde, power, weeks, significance)
+    return _calc_capped(spend, cpa, mde, power, weeks, significance, max_multiplier)
+
+# Pre-defined comparison scenarios: (MDE %, power, significance)
+_SCENARIOS = {
+    'high': (10, 0.90, 0.05),    # 10% MDE, 90% power, 5% sig
+    'medium': (10, 0.80, 0.10),  # 10% MDE, 80% power, 10% sig
+    'low': (15, 0.70, 0.10),     # 15% MDE, 70% power, 10% sig
+}
+
+@st.cache_data(max_entries=8)
+def scenario_budgets(spend, cpa, weeks, max_multiplier):
+    """
+    Budgets for all pre-defined scenarios in one cached call.
+    
+    Only the scenarios are cached: their MDE/power/significance are fixed, so
+    they hit on every rerun with the same spend inputs. The custom configuration
+    changes with each slider move and would just churn the cache.
+    """
+    return {
+        tier: calculate_budget(spend, cpa, mde, power, weeks, significance, max_multiplier)
+        for tier, (mde, power, significance) in _SCENARIOS.items()
+    }
+
+# Shared formatters for scenario cards and the summary table
+_usd = "${:,.0f}".format
+_mult = "{:.1f}x".format
+
+# Feasibility by spend multiplier (upper bounds, exclusive): (level, emoji, risk assessment)
+# A result capped at the default 5.0x cap therefore rates LOW
+_FEAS_TIERS = (3.0, 5.0)
+_FEAS_INFO = (
+    ("HIGH", "🟢", "Low risk - feasible budget"),
+    ("MEDIUM", "🟡", "Moderate risk - high budget"),
+    ("LOW", "🔴", "High risk - very expensive"),
+)
+
 # Calculate scenarios
 # Convert user inputs to decimal
 power_decimal = power_input / 100
 
 # User's custom configuration
 custom = calculate_budget(monthly_spend, cpa, mde_input, power_decimal, duration, pvalue_input, max_multiplier)
+feasibility, feasibility_emoji, feasibility_risk = _FEAS_INFO[bisect.bisect_right(_FEAS_TIERS, custom['multiplier'])]
 
 # Pre-defined scenarios for comparison
-scenarios = {
-    'high': calculate_budget(monthly_spend, cpa, 10, 0.90, duration, 0.05, max_multiplier),  # 10% MDE, 90% power, 5% sig
-    'medium': calculate_budget(monthly_spend, cpa, 10, 0.80, duration, 0.10, max_multiplier), # 10% MDE, 80% power, 10% sig
-    'low': calculate_budget(monthly_spend, cpa, 15, 0.70, duration, 0.10, max_multiplier)    # 15% MDE, 70% power, 10% sig
-}
+# Only rebuilt when the inputs they depend on change, so unrelated widgets
+# (MDE, power, AQL rate, ...) reuse the stored scenarios and summary table
+st.session_state.setdefault("scenario_key", None)
+scenario_key = (monthly_spend, cpa, duration, max_multiplier)
+
+if st.session_state["scenario_key"] != scenario_key:
+    scenarios = scenario_budgets(monthly_spend, cpa, duration, max_multiplier)
+
+    # Formatted once here and reused by both the scenario cards and the summary table
+    scenario_labels = {
+        tier: {
+            'incremental': _usd(result['incremental']),
+            'total': _usd(result['total']),
+            'multiplier': _mult(result['multiplier']),
+        }
+        for tier, result in scenarios.items()
+    }
+
+    # Summary table - plain Markdown is enough for a static 3-row table
+    # (escaped "\$" keeps dollar signs from being read as LaTeX delimiters)
+    summary_table = (
+        "| Option | Extra Budget | Total Budget | Success Chance | Spend Multiplier | Min Detectable Lift |\n"
+        "|---|---|---|---|---|---|\n"
+        f"| ✅ Recommended | \\{scenario_labels['high']['incremental']} | \\{scenario_labels['high']['total']} | 60-90% | {scenario_labels['high']['multiplier']} | 10% |\n"
+        f"| ⚠️ Moderate | \\{scenario_labels['medium']['incremental']} | \\{scenario_labels['medium']['total']} | 30-60% | {scenario_labels['medium']['multiplier']} | 10% |\n"
+        f"| ❌ Not Recommended | \\{scenario_labels['low']['incremental']} | \\{scenario_labels['low']['total']} | 0-30% | {scenario_labels['low']['multiplier']} | 15% |\n"
+    )
+
+    st.session_state["scenarios"] = scenarios
+    st.session_state["scenario_labels"] = scenario_labels
+    st.session_state["summary_table"] = summary_table
+    st.session_state["scenario_key"] = scenario_key
+
+scenarios = st.session_state["scenarios"]
+scenario_labels = st.session_state["scenario_labels"]
+summary_table = st.session_state["summary_table"]
 
 # Display header
 st.header("💰 Budget Requirements for Incrementality Test")
@@ -302,8 +424,6 @@ with diag_col4:
         st.metric("🔥 Uncapped", f"{custom['multiplier']:.1f}x")
         st.caption("Full statistical requirement applied")
     else:
-        feasibility = "HIGH" if custom['multiplier'] <= 3 else "MEDIUM" if custom['multiplier'] <= 4 else "LOW"
-        feasibility_emoji = "🟢" if feasibility == "HIGH" else "🟡" if feasibility == "MEDIUM" else "🔴"
         st.metric("Feasibility", f"{feasibility_emoji} {feasibility}")
         st.caption("Budget practicality assessment")
 
@@ -342,29 +462,16 @@ st.caption("Pre-configured statistical scenarios with standard industry paramete
 # Three columns
 col1, col2, col3 = st.columns(3)
 
-# Pre-format values to avoid f-string markdown conflicts
-high_inc = f"${scenarios['high']['incremental']:,.0f}"
-high_total = f"${scenarios['high']['total']:,.0f}"
-high_mult = f"{scenarios['high']['multiplier']:.1f}x"
-
-med_inc = f"${scenarios['medium']['incremental']:,.0f}"
-med_total = f"${scenarios['medium']['total']:,.0f}"
-med_mult = f"{scenarios['medium']['multiplier']:.1f}x"
-
-low_inc = f"${scenarios['low']['incremental']:,.0f}"
-low_total = f"${scenarios['low']['total']:,.0f}"
-low_mult = f"{scenarios['low']['multiplier']:.1f}x"
-
 with col1:
     st.info("📊 **High Confidence**")
     st.markdown(f"""
     **Settings:** 10% MDE • 90% Power • p<0.05
     
-    **Incremental Budget:** {high_inc}
+    **Incremental Budget:** {scenario_labels['high']['incremental']}
     
-    **Total Test Budget:** {high_total}
+    **Total Test Budget:** {scenario_labels['high']['total']}
 
-    **Spend Multiplier:** {high_mult} normal
+    **Spend Multiplier:** {scenario_labels['high']['multiplier']} normal
     
     📈 **Success Probability:** 60-90%  
     🎯 **Detects:** 10%+ improvements  
@@ -376,11 +483,11 @@ with col2:
     st.markdown(f"""
     **Settings:** 10% MDE • 80% Power • p<0.10
     
-    **Incremental Budget:** {med_inc}  
+    **Incremental Budget:** {scenario_labels['medium']['incremental']}  
 
-    **Total Test Budget:** {med_total}
+    **Total Test Budget:** {scenario_labels['medium']['total']}
 
-    **Spend Multiplier:** {med_mult} normal
+    **Spend Multiplier:** {scenario_labels['medium']['multiplier']} normal
     
     📈 **Success Probability:** 30-60%  
     🎯 **Detects:** 10%+ improvements  
@@ -392,11 +499,11 @@ with col3:
     st.markdown(f"""
     **Settings:** 15% MDE • 70% Power • p<0.10
     
-    **Incremental Budget:** {low_inc}  
+    **Incremental Budget:** {scenario_labels['low']['incremental']}  
 
-    **Total Test Budget:** {low_total}
+    **Total Test Budget:** {scenario_labels['low']['total']}
 
-    **Spend Multiplier:** {low_mult} normal
+    **Spend Multiplier:** {scenario_labels['low']['multiplier']} normal
     
     📈 **Success Probability:** 0-30%  
     🎯 **Detects:** Only 15%+ improvements  
@@ -407,32 +514,17 @@ with col3:
 st.markdown("---")
 st.subheader("📊 Summary Comparison")
 
-df = pd.DataFrame({
-    "Option": ["✅ Recommended", "⚠️ Moderate", "❌ Not Recommended"],
-    "Extra Budget": [
-        f"${scenarios['high']['incremental']:,.0f}",
-        f"${scenarios['medium']['incremental']:,.0f}",
-        f"${scenarios['low']['incremental']:,.0f}"
-    ],
-    "Total Budget": [
-        f"${scenarios['high']['total']:,.0f}",
-        f"${scenarios['medium']['total']:,.0f}",
-        f"${scenarios['low']['total']:,.0f}"
-    ],
-    "Success Chance": ["60-90%", "30-60%", "0-30%"],
-    "Spend Multiplier": [
-        f"{scenarios['high']['multiplier']:.1f}x",
-        f"{scenarios['medium']['multiplier']:.1f}x",
-        f"{scenarios['low']['multiplier']:.1f}x"
-    ],
-    "Min Detectable Lift": ["10%", "10%", "15%"]
-})
-
-st.table(df)
+st.markdown(summary_table)
 
-# Mathematical Methodology
-with st.expander("📐 Mathematical Methodology & Formulas"):
-    st.markdown(f"""
+# Long-form explainer text is only rebuilt when the values it interpolates change
+st.session_state.setdefault("md_key", None)
+md_key = (channel, monthly_spend, duration, cpa, mde_input, power_input, pvalue_input,
+          custom['multiplier'], custom['total'])
+
+if st.session_state["md_key"] != md_key:
+    normal_budget_str = _usd(custom['normal'])
+
+    methodology_md = f"""
     ## Practical Incrementality Testing Budget Calculation
     
     ### ✅ **NEW INDUSTRY-STANDARD APPROACH:**
@@ -462,13 +554,13 @@ with st.expander("📐 Mathematical Methodology & Formulas"):
     - **Significance Adjustment**: {0.05/pvalue_input:.2f} (based on p<{pvalue_input})
     
     ### 3. Budget Calculation
-    **Normal Budget** = ${monthly_spend:,}/month × {duration} weeks ÷ 4.33 = ${monthly_spend * duration / 4.33:,.0f}
+    **Normal Budget** = ${monthly_spend:,}/month × {duration} weeks ÷ 4.33 = {normal_budget_str}
     
     **Final Multiplier** = {custom['multiplier']:.1f}x (capped between 1.5-5.0x for practicality)
     
-    **Total Test Budget** = ${monthly_spend * duration / 4.33:,.0f} × {custom['multiplier']:.1f} = ${custom['total']:,.0f}
+    **Total Test Budget** = {normal_budget_str} × {custom['multiplier']:.1f} = ${custom['total']:,.0f}
     
-    **Incremental Budget** = ${custom['total']:,.0f} - ${monthly_spend * duration / 4.33:,.0f} = ${custom['incremental']:,.0f}
+    **Incremental Budget** = ${custom['total']:,.0f} - {normal_budget_str} = ${custom['incremental']:,.0f}
     
     ### 4. Key Inputs Impacting Budget
     
@@ -509,30 +601,9 @@ with st.expander("📐 Mathematical Methodology & Formulas"):
     - **Multi-Touch Attribution**: Tracks full customer journey
     - **Geographic Lift Studies**: Market-level testing (requires $2M+ budgets)
     - **Synthetic Control Methods**: ML-based counterfactual analysis
-    """)
-
-# How it works
-with st.expander("How This Works"):
-    st.markdown(f"""
-    **What you're testing:** Whether {channel} actually drives conversions or if customers would convert anyway.
-    
-    **The process:**
-    1. Split your {channel} audience into two groups
-    2. Test group gets {scenarios['medium']['multiplier']:.1f}x your normal budget
-    3. Control group sees no {channel} ads
-    4. Compare conversion rates after {duration} weeks
-    
-    **Why extra budget?** The additional spend creates a measurable "lift" that reveals {channel}'s true impact.
-    
-    **Your assumptions:**
-    - Cost per form: ${cpa}
-    - Current monthly spend: ${monthly_spend:,}
-    - Test duration: {duration} weeks
-    """)
+    """
 
-# Key Improvements Summary
-with st.expander("🔧 What Was Fixed in This Calculator"):
-    st.markdown("""
+    fixes_md = f"""
     ### Major Issues Identified & Resolved:
     
     #### ❌ **Previous Problems:**
@@ -580,21 +651,50 @@ with st.expander("🔧 What Was Fixed in This Calculator"):
     - Missing attribution overlap with other channels
     - Can't model YouTube → Google search behavior
     - No adjustment for organic performance changes
+    """
+
+    st.session_state["md_cached"] = (methodology_md, fixes_md)
+    st.session_state["md_key"] = md_key
+
+methodology_md, fixes_md = st.session_state["md_cached"]
+
+# Mathematical Methodology
+with st.expander("📐 Mathematical Methodology & Formulas"):
+    st.markdown(methodology_md)
+
+# How it works
+with st.expander("How This Works"):
+    st.markdown(f"""
+    **What you're testing:** Whether {channel} actually drives conversions or if customers would convert anyway.
+    
+    **The process:**
+    1. Split your {channel} audience into two groups
+    2. Test group gets {scenarios['medium']['multiplier']:.1f}x your normal budget
+    3. Control group sees no {channel} ads
+    4. Compare conversion rates after {duration} weeks
+    
+    **Why extra budget?** The additional spend creates a measurable "lift" that reveals {channel}'s true impact.
+    
+    **Your assumptions:**
+    - Cost per form: ${cpa}
+    - Current monthly spend: ${monthly_spend:,}
+    - Test duration: {duration} weeks
     """)
 
+# Key Improvements Summary
+with st.expander("🔧 What Was Fixed in This Calculator"):
+    st.markdown(fixes_md)
+
 # Final Recommendations
 st.markdown("---")
 st.subheader("💡 Final Recommendations")
 
-recommendation_level = "HIGH" if custom['multiplier'] < 3 else "MEDIUM" if custom['multiplier'] < 5 else "LOW"
-recommendation_color = "🟢" if recommendation_level == "HIGH" else "🟡" if recommendation_level == "MEDIUM" else "🔴"
-
 st.markdown(f"""
-{recommendation_color} **Feasibility: {recommendation_level}**
+{feasibility_emoji} **Feasibility: {feasibility}**
 
 **Budget Required:** ${custom['total']:,.0f} ({custom['multiplier']:.1f}x normal spend)
 **Statistical Power:** {power_input}% chance of detecting {mde_input}% lift
-**Risk Assessment:** {'Low risk - feasible budget' if recommendation_level == 'HIGH' else 'Moderate risk - high budget' if recommendation_level == 'MEDIUM' else 'High risk - very expensive'}
+**Risk Assessment:** {feasibility_risk}
 
 ### Next Steps:
 1. **Validate Assumptions**: Confirm ${cpa} cost per form and {aql_rate:.0%} AQL rate